@@ -28,4 +28,5 @@ from SCons.Script import COMMAND_LINE_TARGETS, DefaultEnvironment, SConscript
 env = DefaultEnvironment()
 
 if "nobuild" not in COMMAND_LINE_TARGETS:
-    SConscript(join(env.PioPlatform().get_package_dir("framework-arduinoespressif8266"), "tools", "platformio-build.py"))
+    FRAMEWORK_DIR = env.PioPlatform().get_package_dir("framework-arduinoespressif8266")
+    SConscript(join(FRAMEWORK_DIR, "tools", "platformio-build.py"))
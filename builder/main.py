@@ -14,12 +14,20 @@
 
 # pylint: disable=redefined-outer-name
 
+import atexit
+import bisect
 import functools
+import mmap
+import os
 import re
 import sys
 import shutil
+import struct
 import subprocess
+import threading
 import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join, isfile
 from pathlib import Path
 from penv_setup import setup_python_environment
@@ -38,27 +46,16 @@ board = env.BoardConfig()
 filesystem = board.get("build.filesystem", "littlefs")
 platformio_dir = config.get("platformio", "core_dir")
 platform_dir = Path(platform.get_dir())
+_CONFIG_SECTIONS = ("common", "env:" + env["PIOENV"])
 
 # Configure Python environment through centralized platform management
 # Must happen before importing penv-installed packages (fatfs, littlefs, etc.)
-PYTHON_EXE, esptool_binary_path = setup_python_environment(env, platform, platformio_dir)
-
-from littlefs import LittleFS
-from fatfs import Partition, RamDisk, create_extended_partition
-from fatfs import create_esp32_wl_image
-from fatfs import calculate_esp32_wl_overhead
-from fatfs import is_esp32_wl_image, extract_fat_from_esp32_wl
-from fatfs.partition_extended import PartitionExtended
-from fatfs.wrapper import pyf_mkfs, PY_FR_OK as FR_OK
-
-# Load SPIFFS generator from local module
-spiffsgen_path = platform_dir / "builder" / "spiffsgen.py"
-spec = importlib.util.spec_from_file_location("spiffsgen", str(spiffsgen_path))
-spiffsgen = importlib.util.module_from_spec(spec)
-sys.modules["spiffsgen"] = spiffsgen
-spec.loader.exec_module(spiffsgen)
-SpiffsFS = spiffsgen.SpiffsFS
-SpiffsBuildConfig = spiffsgen.SpiffsBuildConfig
+# IDE data extraction neither builds nor uploads, an already provisioned penv
+# is used as is without verifying its dependencies
+PYTHON_EXE, esptool_binary_path = setup_python_environment(
+    env, platform, platformio_dir,
+    verify_deps=not set(["idedata", "_idedata"]) & set(COMMAND_LINE_TARGETS)
+)
 
 #
 # Helpers
@@ -73,6 +70,31 @@ def BeforeUpload(target, source, env):
         env.AutodetectUploadPort()
 
 
+_MISSING_OPTION = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_project_option(name, default=None):
+    """
+    Look up a project option, the [common] section taking precedence over
+    the current [env:...] section. Results are cached for the build.
+
+    Args:
+        name: Option name, e.g. "board_build.unpack_dir"
+        default: Value returned when no section defines the option
+
+    Returns:
+        The option value or the default
+    """
+    for section in _CONFIG_SECTIONS:
+        # get() returns the given default for a missing option or section,
+        # sparing the separate has_option() walk over the section
+        value = config.get(section, name, _MISSING_OPTION)
+        if value is not _MISSING_OPTION:
+            return value
+    return default
+
+
 def _get_board_f_flash(env):
     frequency = env.subst("$BOARD_F_FLASH")
     frequency = str(frequency).replace("L", "")
@@ -92,6 +114,41 @@ def _parse_size(value):
     return value
 
 
+# Application size and filesystem layout entries of the LD script,
+# lines starting with a comment are not matched. Arduino LD scripts
+# describe the filesystem with _FS_* symbols, other frameworks use _SPIFFS_*
+_LD_SIZES_PATTERN = (
+    rb"^[ \t]*(?:irom0_0_seg\s*:.+len\s*=\s*(?P<app_size>0x[\da-f]+)"
+    rb"|PROVIDE\s*\(\s*_%s_(?P<fs_key>\w+)\s*=\s*(?P<fs_value>0x[\da-f]+)\s*\))"
+)
+_LD_SIZES_RE_ARDUINO = re.compile(_LD_SIZES_PATTERN % b"FS", flags=re.I | re.M)
+_LD_SIZES_RE_NONARDUINO = re.compile(
+    _LD_SIZES_PATTERN % b"SPIFFS", flags=re.I | re.M)
+_IS_ARDUINO = "arduino" in env.subst("$PIOFRAMEWORK")
+
+
+_LD_SCRIPT = None
+
+
+def _get_ld_script(env):
+    """
+    Resolve the linker script of the build once.
+
+    GetActualLDScript() expands LINKFLAGS and searches LIBPATH on every
+    call, the result does not change after the SConscripts are loaded.
+
+    Args:
+        env: SCons environment object
+
+    Returns:
+        str: Path to the linker script
+    """
+    global _LD_SCRIPT
+    if _LD_SCRIPT is None:
+        _LD_SCRIPT = env.GetActualLDScript()
+    return _LD_SCRIPT
+
+
 @functools.lru_cache(maxsize=None)
 def _parse_ld_sizes(ldscript_path):
     assert ldscript_path
@@ -103,39 +160,41 @@ def _parse_ld_sizes(ldscript_path):
     if match:
         result['flash_size'] = _parse_size(match.group(1))
 
-    appsize_re = re.compile(
-        r"irom0_0_seg\s*:.+len\s*=\s*(0x[\da-f]+)", flags=re.I)
-    filesystem_re = re.compile(
-        r"PROVIDE\s*\(\s*_%s_(\w+)\s*=\s*(0x[\da-f]+)\s*\)" % "FS"
-        if "arduino" in env.subst("$PIOFRAMEWORK")
-        else "SPIFFS",
-        flags=re.I,
-    )
-    with open(ldscript_path) as fp:
-        for line in fp.readlines():
-            line = line.strip()
-            if not line or line.startswith("/*"):
-                continue
-            match = appsize_re.search(line)
-            if match:
-                result['app_size'] = _parse_size(match.group(1))
-                continue
-            match = filesystem_re.search(line)
-            if match:
-                result['fs_%s' % match.group(1)] = _parse_size(
-                    match.group(2))
+    with open(ldscript_path, "rb") as fp, \
+            mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ld_sizes_re = (
+            _LD_SIZES_RE_ARDUINO if _IS_ARDUINO else _LD_SIZES_RE_NONARDUINO)
+        # Jump between occurrences of the keywords with a plain substring
+        # search and only run the regex on the lines containing them
+        for keyword in (b"irom0_0_seg", b"PROVIDE"):
+            pos = mm.find(keyword)
+            while pos != -1:
+                match = ld_sizes_re.match(mm, mm.rfind(b"\n", 0, pos) + 1)
+                if match and match.group("app_size"):
+                    result['app_size'] = _parse_size(match.group("app_size").decode())
+                elif match:
+                    result['fs_%s' % match.group("fs_key").decode()] = _parse_size(
+                        match.group("fs_value").decode())
+                pos = mm.find(keyword, pos + len(keyword))
     return result
 
 
 def _get_flash_size(env):
-    ldsizes = _parse_ld_sizes(env.GetActualLDScript())
+    ldsizes = _parse_ld_sizes(_get_ld_script(env))
     if ldsizes['flash_size'] < 1048576:
         return "%dK" % (ldsizes['flash_size'] / 1024)
     return "%dM" % (ldsizes['flash_size'] / 1048576)
 
 
+# Mapping of memory mapped flash addresses of the LD script to flash
+# offsets: below 0x40300000, below 0x411FB000 and above
+_FS_ADDR_THRESHOLDS = (0x40300000, 0x411FB000)
+_FS_ADDR_MASKS = (0xFFFFF, 0xFFFFFF, 0xFFFFFF)
+_FS_ADDR_CORRECTIONS = (0, -0x200000, 0xE00000)
+
+
 def fetch_fs_size(env):
-    ldsizes = _parse_ld_sizes(env.GetActualLDScript())
+    ldsizes = _parse_ld_sizes(_get_ld_script(env))
     for key in ldsizes:
         if key.startswith("fs_"):
             env[key.upper()] = ldsizes[key]
@@ -147,22 +206,127 @@ def fetch_fs_size(env):
 
     # esptool flash starts from 0
     for k in ("FS_START", "FS_END"):
-        _value = 0
-        if env[k] < 0x40300000:
-            _value = env[k] & 0xFFFFF
-        elif env[k] < 0x411FB000:
-            _value = env[k] & 0xFFFFFF
-            _value -= 0x200000  # correction
-        else:
-            _value = env[k] & 0xFFFFFF
-            _value += 0xE00000  # correction
-
-        env[k] = _value
+        idx = bisect.bisect_right(_FS_ADDR_THRESHOLDS, env[k])
+        env[k] = (env[k] & _FS_ADDR_MASKS[idx]) + _FS_ADDR_CORRECTIONS[idx]
     
     # Calculate FS_SIZE for filesystem builders
     env["FS_SIZE"] = env["FS_END"] - env["FS_START"]
 
 
+# Modification time attribute 't' stored by the ESP8266 LittleFS port
+_pack_mtime = struct.Struct("<I").pack
+
+# LittleFS on-disk version "major[.minor[.patch]]", the patch level is
+# ignored. ESP8266 Arduino defaults to 2.0
+_LITTLEFS_VERSION_RE = re.compile(r"^(\d+)(?:\.(\d+))?(?:\.\d+)*$")
+_DEFAULT_LITTLEFS_VERSION = (2 << 16) | 0
+_LITTLEFS_VERSIONS = {
+    "2.0": _DEFAULT_LITTLEFS_VERSION,
+    "2.1": (2 << 16) | 1,
+    "2.2": (2 << 16) | 2,
+}
+
+
+def _write_binary_file(target_file, data):
+    """
+    Write binary data to a file through a raw descriptor, without going
+    through a buffered file object or copying the data.
+
+    Args:
+        target_file: Path of the output file
+        data: File contents (bytes, bytearray or memoryview)
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(target_file, flags, 0o644)
+    try:
+        with memoryview(data) as view:
+            written = 0
+            while written < len(view):
+                written += os.write(fd, view[written:])
+    finally:
+        os.close(fd)
+
+
+# Relative paths only need converting where the OS separator is not "/"
+_CONVERT_SEP = os.sep != "/"
+
+
+def _walk_source_dir(source_dir):
+    """
+    Recursively list the contents of a filesystem data directory.
+
+    Entries come from os.scandir, so their type and stat information is
+    cached on the DirEntry instead of being queried again per path. Each
+    directory is listed before its contents, in name order. Symlinked
+    directories are listed but not descended into, like Path.rglob().
+
+    Args:
+        source_dir: Path to the data directory
+
+    Yields:
+        tuple: (relative path with "/" separators, os.DirEntry)
+    """
+    if not os.path.isdir(source_dir):
+        return
+    prefix_len = len(join(source_dir, ""))
+    pending = [source_dir]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            rel_path = entry.path[prefix_len:]
+            if _CONVERT_SEP:
+                rel_path = rel_path.replace(os.sep, "/")
+            yield rel_path, entry
+            if entry.is_dir() and not entry.is_symlink():
+                subdirs.append(entry.path)
+        pending.extend(reversed(subdirs))
+
+
+# Source files are read ahead on worker threads once a data directory
+# holds at least _PREFETCH_MIN_FILES files, _PREFETCH_DEPTH reads in flight
+_PREFETCH_MIN_FILES = 16
+_PREFETCH_DEPTH = 8
+
+
+def _iter_source_files(source_dir):
+    """
+    Walk a data directory and read file contents ahead of the consumer.
+
+    Reads are overlapped with the writes into the image, which happen on
+    the calling thread only since the filesystem libraries are not thread
+    safe. Small directories are read sequentially.
+
+    Args:
+        source_dir: Path to the data directory
+
+    Yields:
+        tuple: (relative path with "/" separators, os.DirEntry, reader)
+        where reader is None for directories and otherwise a callable
+        returning the file contents, raising OSError if the read failed
+    """
+    entries = list(_walk_source_dir(source_dir))
+    file_count = sum(1 for _, entry in entries if not entry.is_dir())
+    if file_count < _PREFETCH_MIN_FILES:
+        for rel_path, entry in entries:
+            reader = None if entry.is_dir() else Path(entry.path).read_bytes
+            yield rel_path, entry, reader
+        return
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pending = deque()
+        for rel_path, entry in entries:
+            reader = None
+            if not entry.is_dir():
+                reader = pool.submit(Path(entry.path).read_bytes).result
+            pending.append((rel_path, entry, reader))
+            if len(pending) >= _PREFETCH_DEPTH:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+
 def build_fs_image(target, source, env):
     """
     Build LittleFS filesystem image using littlefs-python.
@@ -175,6 +339,8 @@ def build_fs_image(target, source, env):
     Returns:
         int: 0 on success, 1 on failure
     """
+    from littlefs import LittleFS, LittleFSError
+
     # Get parameters
     source_dir = str(source[0])
     target_file = str(target[0])
@@ -191,31 +357,31 @@ def build_fs_image(target, source, env):
 
     # Get disk version from board config or project options
     # ESP8266 Tasmota Arduino framework uses LittleFS v2.0
-    disk_version_str = "2.0"
-    
-    for section in ["common", "env:" + env["PIOENV"]]:
-        if config.has_option(section, "board_build.littlefs_version"):
-            disk_version_str = config.get(section, "board_build.littlefs_version")
-            break
-    
-    try:
-        version_parts = str(disk_version_str).split(".")
-        major = int(version_parts[0])
-        minor = int(version_parts[1]) if len(version_parts) > 1 else 0
-        disk_version = (major << 16) | minor
-    except (ValueError, IndexError):
-        print(f"Warning: Invalid littlefs version '{disk_version_str}', using default 2.0")
-        disk_version = (2 << 16) | 0
+    disk_version_str = _get_project_option("board_build.littlefs_version", "2.0")
+
+    disk_version_str = str(disk_version_str).strip()
+    disk_version = _LITTLEFS_VERSIONS.get(disk_version_str)
+    if disk_version is None:
+        match = _LITTLEFS_VERSION_RE.match(disk_version_str)
+        if match:
+            disk_version = (int(match.group(1)) << 16) | int(match.group(2) or 0)
+        else:
+            print(f"Warning: Invalid littlefs version '{disk_version_str}', using default 2.0")
+            disk_version = _DEFAULT_LITTLEFS_VERSION
 
     # ESP8266 Arduino framework uses: read_size=64, prog_size=64, cache_size=64, lookahead_size=64, block_cycles=16
     # ESP8266 Arduino compiles with LFS_NAME_MAX=32
     # name_max=32 -> LFS_NAME_MAX=32
+    # read, prog and cache sizes shape inline files and commit padding, so
+    # they stay at the device values. Lookahead and block cycles only steer
+    # the allocator while building in RAM: one lookahead window covers the
+    # whole partition and wear leveling relocations are disabled.
     read_size = 64
     prog_size = 64
     cache_size = 64
-    lookahead_size = 64
+    lookahead_size = max(64, min(512, ((block_count + 63) // 64) * 8))
     name_max = 32
-    block_cycles = 16
+    block_cycles = -1
 
     try:
         fs = LittleFS(
@@ -231,32 +397,22 @@ def build_fs_image(target, source, env):
             mount=True
         )
 
-        source_path = Path(source_dir)
-        if source_path.exists():
-            for item in source_path.rglob("*"):
-                rel_path = item.relative_to(source_path)
-                fs_path = rel_path.as_posix()
-                
-                if item.is_dir():
-                    fs.makedirs(fs_path, exist_ok=True)
-                    try:
-                        mtime = int(item.stat().st_mtime)
-                        fs.setattr(fs_path, 't', mtime.to_bytes(4, 'little'))
-                    except Exception:
-                        pass
-                else:
-                    if rel_path.parent != Path("."):
-                        fs.makedirs(rel_path.parent.as_posix(), exist_ok=True)
-                    with fs.open(fs_path, "wb") as dest:
-                        dest.write(item.read_bytes())
-                    try:
-                        mtime = int(item.stat().st_mtime)
-                        fs.setattr(fs_path, 't', mtime.to_bytes(4, 'little'))
-                    except Exception:
-                        pass
-
-        with open(target_file, "wb") as f:
-            f.write(fs.context.buffer)
+        # Directories are listed before their contents, so each one is
+        # created exactly once before its files are written
+        for fs_path, entry, read_file in _iter_source_files(source_dir):
+            if read_file is None:
+                fs.makedirs(fs_path, exist_ok=True)
+            else:
+                data = read_file()
+                with fs.open(fs_path, "wb") as dest:
+                    dest.write(data)
+            try:
+                fs.setattr(fs_path, 't', _pack_mtime(
+                    int(entry.stat().st_mtime) & 0xFFFFFFFF))
+            except (OSError, LittleFSError):
+                pass
+
+        _write_binary_file(target_file, fs.context.buffer)
 
         return 0
 
@@ -265,6 +421,24 @@ def build_fs_image(target, source, env):
         return 1
 
 
+@functools.lru_cache(maxsize=None)
+def _load_spiffsgen():
+    """
+    Load the SPIFFS generator shipped with the platform. It is only needed
+    for SPIFFS images, so plain builds do not pay for loading it.
+
+    Returns:
+        module: spiffsgen module
+    """
+    spiffsgen_path = platform_dir / "builder" / "spiffsgen.py"
+    spec = importlib.util.spec_from_file_location(
+        "spiffsgen", str(spiffsgen_path))
+    spiffsgen = importlib.util.module_from_spec(spec)
+    sys.modules["spiffsgen"] = spiffsgen
+    spec.loader.exec_module(spiffsgen)
+    return spiffsgen
+
+
 def build_spiffs_image(target, source, env):
     """Build SPIFFS filesystem image using spiffsgen.py."""
     source_dir = str(source[0])
@@ -280,7 +454,8 @@ def build_spiffs_image(target, source, env):
     aligned_obj_ix_tables = False
 
     try:
-        spiffs_build_config = SpiffsBuildConfig(
+        spiffsgen = _load_spiffsgen()
+        spiffs_build_config = spiffsgen.SpiffsBuildConfig(
             page_size=page_size,
             page_ix_len=2,
             block_size=block_size,
@@ -297,20 +472,15 @@ def build_spiffs_image(target, source, env):
             aligned_obj_ix_tables=aligned_obj_ix_tables
         )
 
-        spiffs = SpiffsFS(fs_size, spiffs_build_config)
+        spiffs = spiffsgen.SpiffsFS(fs_size, spiffs_build_config)
 
-        source_path = Path(source_dir)
-        if source_path.exists():
-            for item in source_path.rglob("*"):
-                if item.is_file():
-                    rel_path = item.relative_to(source_path)
-                    img_path = "/" + rel_path.as_posix()
-                    spiffs.create_file(img_path, str(item))
+        for rel_path, entry in _walk_source_dir(source_dir):
+            if entry.is_file():
+                spiffs.create_file("/" + rel_path, entry.path)
 
         image = spiffs.to_binary()
 
-        with open(target_file, "wb") as f:
-            f.write(image)
+        _write_binary_file(target_file, image)
 
         print(f"\nSuccessfully created SPIFFS image: {target_file}")
         return 0
@@ -326,8 +496,14 @@ def build_fatfs_image(target, source, env):
     target_file = str(target[0])
     fs_size = env["FS_SIZE"]
     sector_size = env.get("FS_SECTOR", 4096)
-    
-    from fatfs import calculate_esp32_wl_overhead
+
+    # Filesystem libraries are only imported when an image is actually
+    # built or extracted, firmware builds skip loading their extensions
+    from fatfs import (
+        Partition, RamDisk, calculate_esp32_wl_overhead, create_esp32_wl_image)
+    from fatfs.partition_extended import PartitionExtended
+    from fatfs.wrapper import pyf_mkfs, PY_FR_OK as FR_OK
+
     wl_info = calculate_esp32_wl_overhead(fs_size, sector_size)
     
     wl_reserved_sectors = wl_info['wl_overhead_sectors']
@@ -335,12 +511,12 @@ def build_fatfs_image(target, source, env):
     sector_count = wl_info['fat_sectors']
 
     try:
-        storage = bytearray(fat_fs_size)
+        # Anonymous mapping is zero filled on demand and released with
+        # close() instead of staying in the Python heap
+        storage = mmap.mmap(-1, fat_fs_size)
         disk = RamDisk(storage, sector_size=sector_size, sector_count=sector_count)
         base_partition = Partition(disk)
 
-        from fatfs.wrapper import pyf_mkfs
-        FR_OK = 0  # PY_FR_OK constant
         workarea_size = sector_size * 2
         
         ret = pyf_mkfs(
@@ -356,44 +532,33 @@ def build_fatfs_image(target, source, env):
 
         base_partition.mount()
 
-        from fatfs.partition_extended import PartitionExtended
         partition = PartitionExtended(base_partition)
 
         skipped_files = []
 
-        source_path = Path(source_dir)
-        if source_path.exists():
-            for item in source_path.rglob("*"):
-                rel_path = item.relative_to(source_path)
-                fs_path = "/" + rel_path.as_posix()
-
-                if item.is_dir():
-                    try:
-                        partition.mkdir(fs_path)
-                    except Exception:
-                        pass
-                else:
-                    if rel_path.parent != Path("."):
-                        parent_path = "/" + rel_path.parent.as_posix()
-                        try:
-                            partition.mkdir(parent_path)
-                        except Exception:
-                            pass
-
-                    try:
-                        with partition.open(fs_path, "w") as dest:
-                            dest.write(item.read_bytes())
-                    except Exception as e:
-                        print(f"Warning: Failed to write file {rel_path}: {e}")
-                        skipped_files.append(str(rel_path))
+        for rel_path, entry, read_file in _iter_source_files(source_dir):
+            fs_path = "/" + rel_path
+
+            if read_file is None:
+                try:
+                    partition.mkdir(fs_path)
+                except Exception:
+                    pass
+            else:
+                try:
+                    data = read_file()
+                    with partition.open(fs_path, "w") as dest:
+                        dest.write(data)
+                except Exception as e:
+                    print(f"Warning: Failed to write file {rel_path}: {e}")
+                    skipped_files.append(rel_path)
 
         base_partition.unmount()
         
-        from fatfs import create_esp32_wl_image
-        wl_image = create_esp32_wl_image(bytes(storage), fs_size, sector_size)
+        wl_image = create_esp32_wl_image(storage, fs_size, sector_size)
+        storage.close()
 
-        with open(target_file, "wb") as f:
-            f.write(wl_image)
+        _write_binary_file(target_file, wl_image)
 
         if skipped_files:
             print(f"\nWarning: {len(skipped_files)} file(s) skipped")
@@ -407,18 +572,22 @@ def build_fatfs_image(target, source, env):
         return 1
 
 
+# Image builders by board_build.filesystem value
+_FS_BUILDERS = {
+    "littlefs": build_fs_image,
+    "fatfs": build_fatfs_image,
+    "spiffs": build_spiffs_image,
+}
+
+
 def build_fs_router(target, source, env):
     """Route to appropriate filesystem builder based on filesystem type."""
     fs_type = board.get("build.filesystem", "littlefs")
-    if fs_type == "littlefs":
-        return build_fs_image(target, source, env)
-    elif fs_type == "fatfs":
-        return build_fatfs_image(target, source, env)
-    elif fs_type == "spiffs":
-        return build_spiffs_image(target, source, env)
-    else:
-        print(f"Error: Unknown filesystem type '{fs_type}'. Supported types: littlefs, fatfs, spiffs")
+    builder = _FS_BUILDERS.get(fs_type)
+    if builder is None:
+        print(f"Error: Unknown filesystem type '{fs_type}'. Supported types: {', '.join(_FS_BUILDERS)}")
         return 1
+    return builder(target, source, env)
 
 
 def __fetch_fs_size(target, source, env):
@@ -427,7 +596,7 @@ def __fetch_fs_size(target, source, env):
 
 
 def _update_max_upload_size(env):
-    ldsizes = _parse_ld_sizes(env.GetActualLDScript())
+    ldsizes = _parse_ld_sizes(_get_ld_script(env))
     if ldsizes and "app_size" in ldsizes:
         env.BoardConfig().update("upload.maximum_size", ldsizes['app_size'])
 
@@ -545,7 +714,7 @@ if "nobuild" in COMMAND_LINE_TARGETS:
 else:
     target_elf = env.BuildProgram()
     if set(["buildfs", "uploadfs", "uploadfsota"]) & set(COMMAND_LINE_TARGETS):
-        if filesystem not in ("littlefs", "spiffs", "fatfs"):
+        if filesystem not in _FS_BUILDERS:
             sys.stderr.write("Filesystem %s is not supported!\n" % filesystem)
             env.Exit(1)
         target_firm = env.DataToBin(
@@ -576,23 +745,68 @@ if env.get("PIOMAINPROG"):
 
 def _get_unpack_dir(env):
     """Get the unpack directory from project configuration."""
-    unpack_dir = "unpacked_fs"
-    for section in ["common", "env:" + env["PIOENV"]]:
-        if config.has_option(section, "board_build.unpack_dir"):
-            unpack_dir = config.get(section, "board_build.unpack_dir")
-            break
-    return unpack_dir
+    return _get_project_option("board_build.unpack_dir", "unpacked_fs")
 
 
 def _prepare_unpack_dir(unpack_dir):
     """Prepare the unpack directory by removing old content and creating fresh directory."""
     unpack_path = Path(get_project_dir()) / unpack_dir
+    # Old content is renamed into the build directory and deleted on a
+    # background thread which is joined before the process exits.
+    # Leftovers of runs killed before their removal finished are
+    # collected from there as well.
+    trash_dir = Path(env.subst("$BUILD_DIR")) / ".unpack_trash"
+    if trash_dir.is_dir():
+        for stale_path in trash_dir.iterdir():
+            _rmtree_in_background(stale_path)
     if unpack_path.exists():
-        shutil.rmtree(unpack_path)
+        trash_path = trash_dir / str(os.getpid())
+        try:
+            trash_dir.mkdir(parents=True, exist_ok=True)
+            os.rename(unpack_path, trash_path)
+        except OSError:
+            shutil.rmtree(unpack_path)
+        else:
+            _rmtree_in_background(trash_path)
     unpack_path.mkdir(parents=True, exist_ok=True)
     return unpack_path
 
 
+_RMTREE_THREADS = []
+
+
+def _join_rmtree_threads():
+    """Wait for background directory removals to finish."""
+    for thread in _RMTREE_THREADS:
+        thread.join()
+
+
+def _mkdir_once(path):
+    """
+    Create an extraction directory whose parent already exists.
+
+    Image directories whose names differ only by case map to the same
+    directory on case-insensitive hosts, so an existing one is reused.
+
+    Args:
+        path: Directory path to create
+    """
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+
+
+def _rmtree_in_background(path):
+    """Remove a directory tree on a background thread, ignoring errors."""
+    if not _RMTREE_THREADS:
+        atexit.register(_join_rmtree_threads)
+    thread = threading.Thread(
+        target=shutil.rmtree, args=(path,), kwargs={"ignore_errors": True})
+    _RMTREE_THREADS.append(thread)
+    thread.start()
+
+
 def _download_fs_image(env):
     """Download filesystem image from ESP8266 device."""    
     # Ensure upload port is set
@@ -641,11 +855,16 @@ def _download_fs_image(env):
     return fs_file, fs_start, fs_size
 
 
-def _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir):
+def _print_lines(lines):
+    """Print collected per-file progress lines with a single write."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+
+def _extract_littlefs(fs_data, fs_size, unpack_path, unpack_dir):
     """Extract LittleFS filesystem."""
-    # Read the downloaded filesystem image
-    with open(fs_file, 'rb') as f:
-        fs_data = f.read()
+    from littlefs import LittleFS
 
     # Try common ESP8266/ESP32 LittleFS configurations
     configs = [
@@ -677,7 +896,9 @@ def _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir):
                 name_max=32,
                 mount=False
             )
-            fs.context.buffer = bytearray(fs_data)
+            # Mount straight from the private mapping of the image
+            # instead of copying it into a bytearray for every try
+            fs.context.buffer = fs_data
             fs.mount()
             print(f"  Successfully mounted with configuration {i+1}")
             break
@@ -696,32 +917,32 @@ def _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir):
 
     # Extract all files
     file_count = 0
+    log_lines = []
     print("\nExtracted files:")
     try:
         for root, dirs, files in fs.walk("/"):
             if not root.endswith("/"):
                 root += "/"
 
-            # Create directories
+            # Create directories, walk() is top-down so parents of both
+            # directories and files always exist already
             for dir_name in dirs:
                 src_path = root + dir_name
-                dst_path = unpack_path / src_path[1:]
-                dst_path.mkdir(parents=True, exist_ok=True)
-                print(f"  [DIR]  {src_path}")
+                _mkdir_once(join(unpack_path, src_path[1:]))
+                log_lines.append(f"  [DIR]  {src_path}")
 
             # Extract files
             for file_name in files:
                 src_path = root + file_name
-                dst_path = unpack_path / src_path[1:]
-                dst_path.parent.mkdir(parents=True, exist_ok=True)
 
                 with fs.open(src_path, "rb") as src:
                     file_data = src.read()
-                    dst_path.write_bytes(file_data)
+                _write_binary_file(join(unpack_path, src_path[1:]), file_data)
 
-                print(f"  [FILE] {src_path} ({len(file_data)} bytes)")
+                log_lines.append(f"  [FILE] {src_path} ({len(file_data)} bytes)")
                 file_count += 1
 
+        _print_lines(log_lines)
         fs.unmount()
         
         if file_count == 0:
@@ -732,6 +953,7 @@ def _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir):
         
         return 0
     except Exception as e:
+        _print_lines(log_lines)
         print(f"\nError during extraction: {e}")
         try:
             fs.unmount()
@@ -740,13 +962,39 @@ def _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir):
         return 1
 
 
+# SPIFFS object ids are 16-bit little endian on ESP8266
+_SPIFFS_OBJ_ID_LEN = 2
+_unpack_from_spiffs_obj_id = struct.Struct("<H").unpack_from
+
+
+def _spiffs_build_config(page_size, block_size, obj_name_len):
+    """Create the ESP8266 SpiffsBuildConfig for the given geometry."""
+    return _load_spiffsgen().SpiffsBuildConfig(
+        page_size=page_size,
+        page_ix_len=2,
+        block_size=block_size,
+        block_ix_len=2,
+        meta_len=4,
+        obj_name_len=obj_name_len,
+        obj_id_len=_SPIFFS_OBJ_ID_LEN,
+        span_ix_len=2,
+        packed=True,
+        aligned=True,
+        endianness='little',
+        use_magic=True,
+        use_magic_len=True,
+        aligned_obj_ix_tables=False
+    )
+
+
 def _parse_spiffs_config(fs_data, fs_size):
     """
     Auto-detect SPIFFS configuration from the image.
-    Tries common configurations and validates against the image.
-    
+    Tries common configurations by checking the magic of the first block.
+
     Returns:
-        dict: SPIFFS configuration parameters or None
+        SpiffsBuildConfig: Detected configuration, ESP8266 defaults if none
+        of the common configurations matches
     """
     # Common ESP32/ESP8266 SPIFFS configurations (ordered by likelihood for Tasmota/ESP8266)
     common_configs = [
@@ -761,91 +1009,43 @@ def _parse_spiffs_config(fs_data, fs_size):
     ]
     
     print("\nAuto-detecting SPIFFS configuration...")
-    
+
     for i, cfg in enumerate(common_configs, 1):
-        try:
-            print(f"  Try {i}: page_size={cfg['page_size']}, block_size={cfg['block_size']}, obj_name_len={cfg['obj_name_len']}")
-            
-            # Try to parse with this configuration
-            spiffs_build_config = SpiffsBuildConfig(
-                page_size=cfg['page_size'],
-                page_ix_len=2,
-                block_size=cfg['block_size'],
-                block_ix_len=2,
-                meta_len=4,
-                obj_name_len=cfg['obj_name_len'],
-                obj_id_len=2,
-                span_ix_len=2,
-                packed=True,
-                aligned=True,
-                endianness='little',
-                use_magic=True,
-                use_magic_len=True,
-                aligned_obj_ix_tables=False
-            )
-            
-            # Try to create and parse the filesystem
-            spiffs = SpiffsFS(fs_size, spiffs_build_config)
-            spiffs.from_binary(fs_data)
-            
-            # If we got here without exception, this config works
-            print(f"  Successfully detected SPIFFS configuration {i}")
-            
-            return {
-                'page_size': cfg['page_size'],
-                'block_size': cfg['block_size'],
-                'obj_name_len': cfg['obj_name_len'],
-                'meta_len': 4,
-                'use_magic': True,
-                'use_magic_len': True,
-                'aligned_obj_ix_tables': False
-            }
-        except Exception as e:
-            print(f"  Failed: {e}")
+        page_size = cfg['page_size']
+        block_size = cfg['block_size']
+        print(f"  Try {i}: page_size={page_size}, block_size={block_size}, obj_name_len={cfg['obj_name_len']}")
+
+        # The magic is the second to last object id of the last lookup
+        # page of each block, only the first block is checked. Its
+        # position and value depend on the geometry alone, so it is read
+        # before a build config is created.
+        lu_pages = -(-block_size * _SPIFFS_OBJ_ID_LEN // (page_size * page_size))
+        lu_ids_lim = page_size // _SPIFFS_OBJ_ID_LEN
+        magic_offset = (
+            (lu_pages - 1) * page_size + (lu_ids_lim - 2) * _SPIFFS_OBJ_ID_LEN)
+        blocks_lim = fs_size // block_size
+        expected_magic = (0x20140529 ^ page_size ^ blocks_lim) & 0xFFFF
+        if (len(fs_data) < magic_offset + _SPIFFS_OBJ_ID_LEN
+                or _unpack_from_spiffs_obj_id(fs_data, magic_offset)[0]
+                != expected_magic):
+            print("  Failed: SPIFFS magic not found")
             continue
-    
-    # If no config worked, return defaults
+
+        print(f"  Successfully detected SPIFFS configuration {i}")
+        return _spiffs_build_config(page_size, block_size, cfg['obj_name_len'])
+
+    # If no config worked, use the ESP8266 defaults (first configuration)
     print("  Could not auto-detect configuration, using ESP8266 defaults")
-    return {
-        'page_size': 256,
-        'block_size': 8192,
-        'obj_name_len': 32,
-        'meta_len': 4,
-        'use_magic': True,
-        'use_magic_len': True,
-        'aligned_obj_ix_tables': False
-    }
-
-
-def _extract_spiffs(fs_file, fs_size, unpack_path, unpack_dir):
-    """Extract SPIFFS filesystem with auto-detected configuration."""
-    # Read the downloaded filesystem image
-    with open(fs_file, 'rb') as f:
-        fs_data = f.read()
+    return _spiffs_build_config(**common_configs[0])
 
+
+def _extract_spiffs(fs_data, fs_size, unpack_path, unpack_dir):
+    """Extract SPIFFS filesystem with auto-detected configuration."""
     # Auto-detect SPIFFS configuration
-    spiffs_config = _parse_spiffs_config(fs_data, fs_size)
-    
-    # Create SPIFFS build configuration
-    spiffs_build_config = SpiffsBuildConfig(
-        page_size=spiffs_config['page_size'],
-        page_ix_len=2,
-        block_size=spiffs_config['block_size'],
-        block_ix_len=2,
-        meta_len=spiffs_config['meta_len'],
-        obj_name_len=spiffs_config['obj_name_len'],
-        obj_id_len=2,
-        span_ix_len=2,
-        packed=True,
-        aligned=True,
-        endianness='little',
-        use_magic=spiffs_config['use_magic'],
-        use_magic_len=spiffs_config['use_magic_len'],
-        aligned_obj_ix_tables=spiffs_config['aligned_obj_ix_tables']
-    )
+    spiffs_build_config = _parse_spiffs_config(fs_data, fs_size)
 
     # Create SPIFFS filesystem and parse the image
-    spiffs = SpiffsFS(fs_size, spiffs_build_config)
+    spiffs = _load_spiffsgen().SpiffsFS(fs_size, spiffs_build_config)
     spiffs.from_binary(fs_data)
 
     # Extract files
@@ -860,17 +1060,21 @@ def _extract_spiffs(fs_file, fs_size, unpack_path, unpack_dir):
     return 0
 
 
-def _extract_fatfs(fs_file, unpack_path, unpack_dir):
-    """Extract FatFS filesystem."""
-    with open(fs_file, 'rb') as f:
-        fs_data = bytearray(f.read())
+# Concurrent host file writes while extracting a downloaded image
+_EXTRACT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# Writes queued ahead of the pool, bounds the file data held in memory
+_EXTRACT_QUEUE_DEPTH = _EXTRACT_WORKERS * 4
+
 
+def _extract_fatfs(fs_data, unpack_path, unpack_dir):
+    """Extract FatFS filesystem."""
     if len(fs_data) < 512:
         print("Error: Downloaded image is too small to be a valid FAT filesystem")
         return 1
 
-    from fatfs import is_esp32_wl_image, extract_fat_from_esp32_wl
-    
+    from fatfs import RamDisk, create_extended_partition, is_esp32_wl_image
+    from fatfs.esp32_wl import ESP32WearLeveling
+
     # Try common sector sizes for ESP8266/ESP32
     sector_sizes_to_try = [4096, 512, 1024, 2048]
     
@@ -878,13 +1082,19 @@ def _extract_fatfs(fs_file, unpack_path, unpack_dir):
     
     wl_detected = False
     for sector_size in sector_sizes_to_try:
+        # The WL layout starts with an erased dummy sector, compare it at
+        # once before is_esp32_wl_image() checks it byte by byte
+        if fs_data[:sector_size] != b'\xff' * sector_size:
+            continue
         if is_esp32_wl_image(fs_data, sector_size):
             print(f"  Detected Wear Leveling layer with sector_size={sector_size}")
-            fat_data = extract_fat_from_esp32_wl(fs_data, sector_size)
-            if fat_data is None:
-                print("  Failed to extract FAT data from wear-leveling image")
-                continue
-            fs_data = bytearray(fat_data)
+            # FAT data follows the dummy sector, the WL state and config
+            # sectors trail it. A view of the private mapping stays
+            # writable for the RAM disk without copying the FAT data.
+            fat_sectors = (
+                len(fs_data) // sector_size - ESP32WearLeveling.WL_TOTAL_SECTORS)
+            fs_data = memoryview(fs_data)[
+                sector_size:sector_size * (1 + fat_sectors)]
             print(f"  Extracted FAT data: {len(fs_data)} bytes")
             wl_detected = True
             break
@@ -893,7 +1103,7 @@ def _extract_fatfs(fs_file, unpack_path, unpack_dir):
         print("  No Wear Leveling layer detected, treating as raw FAT image...")
 
     # Read sector size from FAT boot sector
-    sector_size = int.from_bytes(fs_data[0x0B:0x0D], byteorder='little')
+    sector_size, = _unpack_from_u16(fs_data, 0x0B)
 
     if sector_size not in [512, 1024, 2048, 4096]:
         print(f"Error: Invalid sector size {sector_size}. Must be 512, 1024, 2048, or 4096")
@@ -915,32 +1125,54 @@ def _extract_fatfs(fs_file, unpack_path, unpack_dir):
 
     print("\nExtracting files:\n")
     extracted_count = 0
-    for root, dirs, files in partition.walk("/"):
-        # Determine target directory
-        if root == "/":
-            abs_root = unpack_path
-        else:
-            rel_root = root[1:] if root.startswith("/") else root
-            abs_root = unpack_path / rel_root
-            abs_root.mkdir(parents=True, exist_ok=True)
-        
-        # Extract files in current directory
-        for filename in files:
-            # Construct source path
+    log_lines = []
+
+    def collect(src_file, size, future):
+        nonlocal extracted_count
+        try:
+            future.result()
+            log_lines.append(f"  [FILE] {src_file} ({size} bytes)")
+            extracted_count += 1
+        except Exception as e:
+            log_lines.append(f"  Warning: Failed to extract {src_file}: {e}")
+
+    # FatFS is not thread safe, files are walked and read on this thread
+    # while the host side writes are handed to a thread pool. Once the
+    # queue is full the oldest write is awaited, so the data of a large
+    # image is never held in memory at once.
+    with ThreadPoolExecutor(max_workers=_EXTRACT_WORKERS) as pool:
+        pending = deque()
+        for root, dirs, files in partition.walk("/"):
+            # Determine target directory, walk() is top-down and visits
+            # each directory once, so its parent always exists already
             if root == "/":
-                src_file = "/" + filename
+                abs_root = unpack_path
             else:
-                src_file = root.rstrip("/") + "/" + filename
-            
-            dst_file = abs_root / filename
-            try:
-                data = partition.read_file(src_file)
-                dst_file.write_bytes(data)
-                print(f"  [FILE] {src_file} ({len(data)} bytes)")
-                extracted_count += 1
-            except Exception as e:
-                print(f"  Warning: Failed to extract {src_file}: {e}")
-    partition.unmount()
+                rel_root = root[1:] if root.startswith("/") else root
+                abs_root = join(unpack_path, rel_root)
+                _mkdir_once(abs_root)
+
+            # Extract files in current directory, the source prefix is
+            # built once per directory
+            src_prefix = root.rstrip("/") + "/"
+            for filename in files:
+                src_file = src_prefix + filename
+                try:
+                    data = partition.read_file(src_file)
+                except Exception as e:
+                    print(f"  Warning: Failed to extract {src_file}: {e}")
+                    continue
+                size = len(data)
+                future = pool.submit(
+                    _write_binary_file, join(abs_root, filename), data)
+                pending.append((src_file, size, future))
+                if len(pending) > _EXTRACT_QUEUE_DEPTH:
+                    collect(*pending.popleft())
+        partition.unmount()
+
+        while pending:
+            collect(*pending.popleft())
+        _print_lines(log_lines)
 
     if extracted_count == 0:
         print("\nNo files were extracted.")
@@ -951,6 +1183,94 @@ def _extract_fatfs(fs_file, unpack_path, unpack_dir):
     return 0
 
 
+# Little endian 16-bit fields of FAT boot sectors (bytes per sector,
+# boot signature)
+_unpack_from_u16 = struct.Struct("<H").unpack_from
+
+# LittleFS magic at offset 8 of the superblock
+_LITTLEFS_MAGIC_OFFSET = 8
+_LITTLEFS_MAGIC = b"littlefs"
+# ESP8266 with Wear Leveling often has the FAT boot sector at 0x1000
+_FAT_BOOT_SECTOR_OFFSETS = (0, 4096, 8192)
+_FAT_BOOT_SIGNATURE = 0xAA55
+_FAT_SECTOR_SIZES = frozenset((512, 1024, 2048, 4096))
+_FAT_MARKER_RE = re.compile(rb"FAT|MSDOS|MSWIN")
+_FS_DETECT_HEADER_SIZE = _FAT_BOOT_SECTOR_OFFSETS[-1] + 512
+# madvise() is missing on Windows and before Python 3.8
+_HAS_MADV_SEQUENTIAL = hasattr(mmap, "MADV_SEQUENTIAL")
+
+
+def _is_littlefs_image(header):
+    """Check for the LittleFS superblock magic."""
+    return header.startswith(_LITTLEFS_MAGIC, _LITTLEFS_MAGIC_OFFSET)
+
+
+def _is_fatfs_image(header):
+    """
+    Check for a FAT boot sector (with or without Wear Leveling): boot
+    signature, a FAT/MSDOS/MSWIN marker and a valid number of bytes per
+    sector.
+    """
+    for offset in _FAT_BOOT_SECTOR_OFFSETS:
+        if (len(header) >= offset + 512
+                and _unpack_from_u16(header, offset + 510)[0]
+                == _FAT_BOOT_SIGNATURE
+                and _FAT_MARKER_RE.search(header, offset, offset + 90)
+                and _unpack_from_u16(header, offset + 11)[0]
+                in _FAT_SECTOR_SIZES):
+            print(f"  FAT boot sector found at offset 0x{offset:x}")
+            return True
+    return False
+
+
+# Signature checks of downloaded images, SPIFFS has no header signature
+# and is assumed when none of them matches
+_FS_DETECTORS = {
+    "littlefs": _is_littlefs_image,
+    "fatfs": _is_fatfs_image,
+}
+
+
+def _detect_fs_type(header, expected=None):
+    """
+    Detect the filesystem of an image from its leading bytes.
+
+    Args:
+        header: First _FS_DETECT_HEADER_SIZE bytes of the image
+        expected: Configured filesystem type, its signature is checked first
+
+    Returns:
+        str: "littlefs", "fatfs" or "spiffs" (ESP8266 default)
+    """
+    # Stable sort, the expected type moves to the front
+    for fs_type in sorted(_FS_DETECTORS, key=lambda t: t != expected):
+        if _FS_DETECTORS[fs_type](header):
+            return fs_type
+    return "spiffs"
+
+
+def _release_fs_image(fs_file, fs_data):
+    """
+    Unmap a downloaded image and drop it from the page cache, it is read
+    only once.
+
+    Args:
+        fs_file: Path to the downloaded image
+        fs_data: mmap of the image
+    """
+    try:
+        fs_data.close()
+    except BufferError:
+        # A view of the mapping is still alive, leave it to the GC
+        return
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(fs_file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
 def download_fs_action(target, source, env):
     """Download and extract filesystem from device."""
     # Get unpack directory (use global env, not the parameter)
@@ -962,61 +1282,49 @@ def download_fs_action(target, source, env):
     if fs_file is None:
         return 1
     
-    # Detect filesystem type
-    with open(fs_file, 'rb') as f:
-        header = f.read(16384)  # Read more to check for offset FAT
-    
-    # Check for filesystem signatures
-    fs_type = None
-    
-    # 1. Check for LittleFS magic at offset 8 of the superblock
-    if len(header) >= 16 and header[8:16] == b'littlefs':
-        fs_type = "littlefs"
-    
-    # 2. Check for FAT filesystem (with or without Wear Leveling)
-    if fs_type is None:
-        # Check multiple possible offsets for FAT boot sector
-        # ESP8266 with WL often has FAT at offset 0x1000 (4096)
-        fat_offsets = [0, 4096, 8192]
-        
-        for offset in fat_offsets:
-            if len(header) >= offset + 512:
-                boot_sector = header[offset:offset+512]
-                
-                # Check for FAT boot signature at offset 510-511
-                if boot_sector[510:512] == b'\x55\xAA':
-                    # Additional validation: check for FAT filesystem markers
-                    # Check for "FAT" string or "MSDOS" in boot sector
-                    if (b'FAT' in boot_sector[0:90] or 
-                        b'MSDOS' in boot_sector[0:90] or
-                        b'MSWIN' in boot_sector[0:90]):
-                        # Verify bytes per sector
-                        bytes_per_sector = int.from_bytes(boot_sector[11:13], byteorder='little')
-                        if bytes_per_sector in [512, 1024, 2048, 4096]:
-                            fs_type = "fatfs"
-                            print(f"  FAT boot sector found at offset 0x{offset:x}")
-                            break
-    
-    # 3. Default to SPIFFS for ESP8266
-    if fs_type is None:
-        fs_type = "spiffs"
-    
-    print(f"\nDetected filesystem: {fs_type.upper()}")
-    
-    # Prepare unpack directory
-    unpack_path = _prepare_unpack_dir(unpack_dir)
-    
-    # Extract filesystem
+    # An empty file can't be mapped, report it before trying
+    try:
+        image_size = os.path.getsize(fs_file)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    if not image_size:
+        print("Error: Downloaded filesystem image is empty")
+        return 1
+
+    fs_data = None
     try:
+        # Map the image once for detection and extraction. The mapping is
+        # private copy-on-write: pages are loaded on demand and writes of the
+        # FAT driver never reach the downloaded file.
+        with open(fs_file, 'rb') as f:
+            fs_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        # Extraction scans the image front to back, ask for full readahead
+        if _HAS_MADV_SEQUENTIAL:
+            fs_data.madvise(mmap.MADV_SEQUENTIAL)
+
+        # Detect filesystem type
+        fs_type = _detect_fs_type(fs_data[:_FS_DETECT_HEADER_SIZE], filesystem)
+
+        print(f"\nDetected filesystem: {fs_type.upper()}")
+
+        # Prepare unpack directory
+        unpack_path = _prepare_unpack_dir(unpack_dir)
+
+        # Extract filesystem
         if fs_type == "littlefs":
-            return _extract_littlefs(fs_file, fs_size, unpack_path, unpack_dir)
+            return _extract_littlefs(fs_data, fs_size, unpack_path, unpack_dir)
         elif fs_type == "fatfs":
-            return _extract_fatfs(fs_file, unpack_path, unpack_dir)
+            return _extract_fatfs(fs_data, unpack_path, unpack_dir)
         else:
-            return _extract_spiffs(fs_file, fs_size, unpack_path, unpack_dir)
+            return _extract_spiffs(fs_data, fs_size, unpack_path, unpack_dir)
     except Exception as e:
         print(f"Error: {e}")
         return 1
+    finally:
+        if fs_data is not None:
+            _release_fs_image(fs_file, fs_data)
 
 
 #
@@ -12,35 +12,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import hashlib
+import importlib.metadata
 import json
 import os
+import queue
 import re
-import semantic_version
+import shutil
 import site
 import socket
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 from urllib.parse import urlparse
 
 from platformio.package.version import pepver_to_semver
 from platformio.compat import IS_WINDOWS
 
-# Check Python version requirement
-if sys.version_info < (3, 10):
-    sys.stderr.write(
-        f"Error: Python 3.10 or higher is required. "
-        f"Current version: {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}\n"
-        f"Please update your Python installation.\n"
-    )
-    sys.exit(1)
-
 github_actions = bool(os.getenv("GITHUB_ACTIONS"))
 
-PLATFORMIO_URL_VERSION_RE = re.compile(
-    r'/v?(\d+\.\d+\.\d+(?:[.-](?:alpha|beta|rc|dev|post|pre)\d*)?(?:\.\d+)?)(?:\.(?:zip|tar\.gz|tar\.bz2))?$',
-    re.IGNORECASE,
-)
+# Probe subprocesses only return captured output, don't allocate a console window for them on Windows
+PROBE_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0
+
+# Descriptors are not inheritable by default (PEP 446), keeping them open on POSIX skips closing
+# every possible descriptor in the child and lets CPython launch installer and probe subprocesses
+# through posix_spawn. Windows keeps closing them, handles are inherited otherwise.
+SPAWN_CLOSE_FDS = IS_WINDOWS
 
 # Python dependencies required for platform builds
 python_deps = {
@@ -61,6 +61,44 @@ python_deps = {
     "pyelftools": ">=0.32"
 }
 
+# Installer requirement of each dependency, direct URLs are passed on as they are
+python_requirements = {
+    package: spec if spec.startswith(("http://", "https://", "git+", "file://")) else f"{package}{spec}"
+    for package, spec in python_deps.items()
+}
+
+PLATFORMIO_URL_VERSION_PATTERN = (
+    r'/v?(\d+\.\d+\.\d+(?:[.-](?:alpha|beta|rc|dev|post|pre)\d*)?(?:\.\d+)?)(?:\.(?:zip|tar\.gz|tar\.bz2))?$'
+)
+
+# Dependencies parsed on first use, keyed by (package, specification):
+# (normalized name, required version or None, parsed version specification or None)
+_PARSED_DEPS = {}
+
+
+def _check_python_version():
+    """
+    Exit with an error if the running Python is older than 3.10.
+    Checked when the penv is set up, not on import, so targets that never touch the penv
+    don't pay for it.
+    """
+    if sys.version_info < (3, 10):
+        sys.stderr.write(
+            f"Error: Python 3.10 or higher is required. "
+            f"Current version: {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}\n"
+            f"Please update your Python installation.\n"
+        )
+        sys.exit(1)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_platformio_url_version_re():
+    """
+    Compile the pattern extracting the version of a platformio URL, only needed if the
+    installed packages are checked.
+    """
+    return re.compile(PLATFORMIO_URL_VERSION_PATTERN, re.IGNORECASE)
+
 
 def has_internet_connection(timeout=5):
     """
@@ -68,6 +106,8 @@ def has_internet_connection(timeout=5):
     Can be overridden by setting PLATFORMIO_OFFLINE=1 environment variable.
     1) If HTTPS/HTTP proxy environment variable is set, test TCP connectivity to the proxy endpoint.
     2) Otherwise, test direct TCP connectivity to common HTTPS endpoints (port 443).
+       The endpoints are probed concurrently, the first successful connection wins.
+       The whole probe, name resolution included, gives up after the timeout.
     
     Args:
         timeout (int): Timeout duration in seconds for the connection test.
@@ -95,26 +135,132 @@ def has_internet_connection(timeout=5):
 
     # 2) Test direct TCP connectivity to common HTTPS endpoints (port 443).
     https_hosts = ("pypi.org", "files.pythonhosted.org", "github.com")
-    for host in https_hosts:
+    results = queue.SimpleQueue()
+
+    def probe(host):
         try:
             socket.create_connection((host, 443), timeout=timeout).close()
-            return True
+            results.put(True)
         except Exception:
-            continue
+            results.put(False)
+
+    # Daemon threads, probes still pending after the first success don't delay the exit
+    for host in https_hosts:
+        threading.Thread(target=probe, args=(host,), daemon=True).start()
+    # The connect timeout doesn't cover the DNS lookup, a single deadline bounds both
+    deadline = time.monotonic() + timeout
+    try:
+        for _ in https_hosts:
+            if results.get(timeout=max(0, deadline - time.monotonic())):
+                return True
+    except queue.Empty:
+        pass
 
     # Direct DNS:53 connection is abolished due to many false positives on enterprise networks
     # (add it at the end if necessary)
     return False
 
 
+def start_internet_check():
+    """
+    Run has_internet_connection() in a background daemon thread.
+    
+    Returns:
+        callable: Waits for the check to finish and returns its result
+    """
+    result = []
+    thread = threading.Thread(target=lambda: result.append(has_internet_connection()), daemon=True)
+    thread.start()
+
+    def wait():
+        thread.join()
+        return bool(result and result[0])
+
+    return wait
+
+
+@functools.lru_cache(maxsize=None)
 def get_executable_path(penv_dir, executable_name):
     """
     Get the path to an executable based on the penv_dir.
+    Cached, the same few executables of one penv are looked up throughout the setup.
     """
     exe_suffix = ".exe" if IS_WINDOWS else ""
     scripts_dir = "Scripts" if IS_WINDOWS else "bin"
     
-    return str(Path(penv_dir) / scripts_dir / f"{executable_name}{exe_suffix}")
+    return os.path.join(penv_dir, scripts_dir, f"{executable_name}{exe_suffix}")
+
+
+@functools.lru_cache(maxsize=None)
+def _find_system_uv():
+    """
+    Find the uv executable in PATH, used when the penv was not created with uv.
+    PATH is only searched on the first call and only when uv is actually needed.
+    
+    Returns:
+        str or None: Absolute path to uv, None if not found
+    """
+    return shutil.which("uv")
+
+
+def _create_venv_with_uv(python_exe, penv_dir):
+    """
+    Try to create the virtual environment with uv, found next to python_exe or in PATH.
+    uv is only started if its executable exists, no process is spawned on systems without uv.
+    
+    Args:
+        python_exe (str): Python executable the virtual environment is created for
+        penv_dir (str): Path to virtual environment directory
+    
+    Returns:
+        str or None: Path to uv executable if the penv was created, None otherwise
+    """
+    uv_cmd = os.path.join(os.path.dirname(python_exe), "uv.exe" if IS_WINDOWS else "uv")
+    if not os.path.isfile(uv_cmd):
+        uv_cmd = _find_system_uv()
+    if not uv_cmd:
+        return None
+
+    try:
+        subprocess.check_call(
+            [uv_cmd, "venv", "--clear", f"--python={python_exe}", penv_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=90
+        )
+    except Exception:
+        return None
+
+    print(f"Created pioarduino Python virtual environment using uv: {penv_dir}")
+    return uv_cmd
+
+
+def _create_venv_in_process(penv_dir):
+    """
+    Create the virtual environment for the running interpreter with the venv module, like
+    `python -m venv --clear` does but without starting another interpreter for it.
+    pip is still bootstrapped, it installs uv into the penv if no uv executable is available.
+    
+    Raises:
+        OSError: If the virtual environment can't be created
+        subprocess.CalledProcessError: If bootstrapping pip fails
+    """
+    import venv
+
+    venv.EnvBuilder(clear=True, symlinks=not IS_WINDOWS, with_pip=True).create(penv_dir)
+
+
+def _check_created_penv(penv_dir, uv_cmd):
+    """
+    Exit with an error if the created virtual environment has no Python executable.
+    """
+    penv_python = get_executable_path(penv_dir, "python")
+    if not os.path.isfile(penv_python):
+        sys.stderr.write(
+            f"Error: Failed to create a proper virtual environment. "
+            f"Missing the `python` binary at {penv_python}! Created with uv: {uv_cmd is not None}\n"
+        )
+        sys.exit(1)
 
 
 def setup_pipenv_in_package(env, penv_dir):
@@ -125,105 +271,310 @@ def setup_pipenv_in_package(env, penv_dir):
     Returns:
         str or None: Path to uv executable if uv was used, None if python -m venv was used
     """
-    if not os.path.isfile(get_executable_path(penv_dir, "python")):
-        # Attempt virtual environment creation using uv package manager
-        uv_success = False
-        uv_cmd = None
-        try:
-            # Derive uv path from PYTHONEXE path
-            python_exe = env.subst("$PYTHONEXE")
-            python_dir = os.path.dirname(python_exe)
-            uv_exe_suffix = ".exe" if IS_WINDOWS else ""
-            uv_cmd = str(Path(python_dir) / f"uv{uv_exe_suffix}")
-            
-            # Fall back to system uv if derived path doesn't exist
-            if not os.path.isfile(uv_cmd):
-                uv_cmd = "uv"
-                
-            subprocess.check_call(
-                [uv_cmd, "venv", "--clear", f"--python={python_exe}", penv_dir],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=90
-            )
-            uv_success = True
-            print(f"Created pioarduino Python virtual environment using uv: {penv_dir}")
+    if os.path.isfile(get_executable_path(penv_dir, "python")):
+        return None
 
-        except Exception:
-            pass
-        
-        # Fallback to python -m venv if uv failed or is not available
-        if not uv_success:
-            uv_cmd = None
+    # Substituted once, used by both creation methods
+    python_exe = env.subst("$PYTHONEXE")
+
+    # Attempt virtual environment creation using uv package manager
+    uv_cmd = _create_venv_with_uv(python_exe, penv_dir)
+
+    # Fallback to the venv module if uv failed or is not available, run in-process
+    # if PYTHONEXE is the interpreter running this build
+    if uv_cmd is None:
+        try:
+            is_running_python = os.path.samefile(python_exe, sys.executable)
+        except OSError:
+            is_running_python = False
+        if is_running_python:
+            try:
+                _create_venv_in_process(penv_dir)
+                print(f"Created pioarduino Python virtual environment: {penv_dir}")
+            except (OSError, subprocess.CalledProcessError) as e:
+                sys.stderr.write(f"Error: Failed to create virtual environment: {e}\n")
+                sys.exit(1)
+        else:
             env.Execute(
                 env.VerboseAction(
-                    '"$PYTHONEXE" -m venv --clear "%s"' % penv_dir,
+                    f'"{python_exe}" -m venv --clear "{penv_dir}"',
                     "Created pioarduino Python virtual environment: %s" % penv_dir,
                 )
             )
-        
-        # Validate virtual environment creation
-        # Ensure Python executable is available
-        penv_python = get_executable_path(penv_dir, "python")
-        if not os.path.isfile(penv_python):
-            sys.stderr.write(
-                f"Error: Failed to create a proper virtual environment. "
-                f"Missing the `python` binary at {penv_python}! Created with uv: {uv_success}\n"
-            )
-            sys.exit(1)
 
-        return uv_cmd if uv_success else None
-    
-    return None
+    _check_created_penv(penv_dir, uv_cmd)
+    return uv_cmd
 
 
-def setup_python_paths(penv_dir):
-    """Setup Python module search paths using the penv_dir."""    
-    # Add site-packages directory
+def get_site_packages_path(penv_dir):
+    """
+    Get the path to the site-packages directory of the penv_dir.
+    """
     python_ver = f"python{sys.version_info.major}.{sys.version_info.minor}"
-    site_packages = (
+    return (
         str(Path(penv_dir) / "Lib" / "site-packages") if IS_WINDOWS
         else str(Path(penv_dir) / "lib" / python_ver / "site-packages")
     )
+
+
+def canonicalize_name(name):
+    """
+    Normalize a distribution name as described in PEP 503.
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def setup_python_paths(penv_dir):
+    """
+    Setup Python module search paths using the penv_dir.
+    Skipped if the site-packages directory is already on sys.path, e.g. when running inside the
+    penv or on a repeated setup, as addsitedir() would process all of its .pth files again.
+    """
+    # Add site-packages directory
+    site_packages = get_site_packages_path(penv_dir)
     
+    if site_packages in sys.path:
+        return
     if os.path.isdir(site_packages):
         site.addsitedir(site_packages)
 
 
+def get_deps_sentinel_path(penv_dir):
+    """
+    Get the path to the file recording the last successful dependency check of the penv_dir.
+    """
+    return str(Path(penv_dir) / ".pioarduino_deps")
+
+
+def _get_deps_hash(python_exe):
+    """
+    Hash the required dependencies together with the penv Python and uv executables they were
+    checked for. Changes whenever python_deps is updated, the Python executable is replaced or
+    uv in the penv is upgraded or removed.
+    """
+    penv_uv_executable = get_executable_path(os.path.dirname(os.path.dirname(python_exe)), "uv")
+    try:
+        uv_mtime = os.path.getmtime(penv_uv_executable)
+    except OSError:
+        uv_mtime = None
+    deps_hash = hashlib.blake2b(digest_size=16)
+    deps_hash.update(json.dumps(python_deps, sort_keys=True).encode())
+    deps_hash.update(python_exe.encode())
+    deps_hash.update(str(os.path.getmtime(python_exe)).encode())
+    deps_hash.update(str(uv_mtime).encode())
+    return deps_hash.hexdigest()
+
+
+def python_deps_up_to_date(python_exe):
+    """
+    Check whether the dependencies were already verified for this penv by a previous build.
+    
+    Args:
+        python_exe: Path to Python executable in the penv
+    
+    Returns:
+        bool: True if the recorded dependency check is still valid, False otherwise
+    """
+    penv_dir = os.path.dirname(os.path.dirname(python_exe))
+    try:
+        with open(get_deps_sentinel_path(penv_dir), "r", encoding="utf-8") as fp:
+            return fp.read().strip() == _get_deps_hash(python_exe)
+    except OSError:
+        return False
+
+
+def _write_deps_sentinel(python_exe):
+    """Record a successful dependency check of the penv."""
+    penv_dir = os.path.dirname(os.path.dirname(python_exe))
+    try:
+        with open(get_deps_sentinel_path(penv_dir), "w", encoding="utf-8") as fp:
+            fp.write(_get_deps_hash(python_exe))
+    except OSError as e:
+        print(f"Warning: Could not write dependency check sentinel: {e}")
+
+
 def get_packages_to_install(deps, installed_packages):
     """
     Generator for Python packages that need to be installed.
-    Compares package names case-insensitively.
+    Compares package names by their PEP 503 normalized form.
     
     Args:
         deps (dict): Dictionary of package names and version specifications
-        installed_packages (dict): Dictionary of currently installed packages (keys should be lowercase)
+        installed_packages (dict): Dictionary of currently installed packages (keys should be normalized,
+            a version of None marks an installed package with an unparseable version)
         
     Yields:
         str: Package name that needs to be installed
     """
     for package, spec in deps.items():
-        name = package.lower()
-        if name not in installed_packages:
+        parsed = _PARSED_DEPS.get((package, spec))
+        if parsed is None:
+            parsed = _PARSED_DEPS[(package, spec)] = _parse_dependency(package, spec)
+        name, expected_ver, version_spec = parsed
+
+        installed_ver = installed_packages.get(name, False)
+        if installed_ver is False:
             yield package
-        elif name == "platformio":
-            # Enforce the version from the direct URL if it looks like one.
-            # If version can't be parsed, fall back to accepting any installed version.
-            m = PLATFORMIO_URL_VERSION_RE.search(spec)
-            if m:
-                expected_ver = pepver_to_semver(m.group(1))
-                if installed_packages.get(name) != expected_ver:
-                    # Reinstall to align with the pinned URL version
-                    yield package
-            else:
-                continue
-        else:
-            version_spec = semantic_version.SimpleSpec(spec)
-            if not version_spec.match(installed_packages[name]):
+        elif installed_ver is None:
+            # Unknown version, assume the installed package is fine
+            continue
+        elif expected_ver is not None:
+            if installed_ver != expected_ver:
+                # Reinstall to align with the pinned URL version
                 yield package
+        elif version_spec is not None and not version_spec.match(installed_ver):
+            yield package
+
+
+def _parse_dependency(package, spec):
+    """
+    Parse a dependency of python_deps for get_packages_to_install().
+    
+    Args:
+        package (str): Package name
+        spec (str): Version specification or direct URL of the package
+    
+    Returns:
+        tuple: (normalized name, version required by a platformio URL or None,
+            semantic_version.SimpleSpec or None if any version is accepted)
+    """
+    name = canonicalize_name(package)
+    if name == "platformio":
+        # Enforce the version from the direct URL if it looks like one.
+        # If version can't be parsed, fall back to accepting any installed version.
+        m = _get_platformio_url_version_re().search(spec)
+        return name, pepver_to_semver(m.group(1)) if m else None, None
+
+    # Imported here, a penv with verified dependencies never needs it
+    import semantic_version
+
+    return name, None, semantic_version.SimpleSpec(spec)
+
+
+# uv settings for installations into the penv, values set by the user take precedence.
+# Bytecode is compiled at install time instead of on the first build importing the packages.
+UV_ENV_DEFAULTS = {
+    "UV_COMPILE_BYTECODE": "1",
+    "UV_NO_PROGRESS": "1",
+}
+
+
+def _get_uv_env(uv_cache_dir=None):
+    """
+    Build the subprocess environment for uv with UV_ENV_DEFAULTS and UV_CACHE_DIR if specified.
+    
+    Returns:
+        dict: Environment for the uv subprocess
+    """
+    uv_env = dict(os.environ)
+    for name, value in UV_ENV_DEFAULTS.items():
+        uv_env.setdefault(name, value)
+    if uv_cache_dir:
+        uv_env["UV_CACHE_DIR"] = str(uv_cache_dir)
+    return uv_env
 
 
-def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
+# Leading bytes of native executables: ELF, PE (Windows) and Mach-O (thin and universal)
+EXECUTABLE_MAGICS = (
+    b"\x7fELF", b"MZ",
+    b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf", b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe",
+    b"\xca\xfe\xba\xbe",
+)
+
+
+def _is_native_executable(path):
+    """
+    Check if path is an executable binary by its magic bytes, without starting it.
+    Catches missing, truncated or emptied files, e.g. after an interrupted installation.
+    
+    Returns:
+        bool: True if the file exists, is executable and starts with a known binary magic
+    """
+    if not os.access(path, os.X_OK):
+        return False
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(4).startswith(EXECUTABLE_MAGICS)
+    except OSError:
+        return False
+
+
+# uv installs restricted to the cache either succeed quickly or fail quickly
+UV_OFFLINE_TIMEOUT = 60
+
+# uv errors of an offline install caused by packages or metadata missing in the cache
+UV_CACHE_MISS_RE = re.compile(
+    r"not found in the cache|network (?:connectivity )?(?:is|was) disabled", re.IGNORECASE
+)
+
+
+def _install_packages(python_exe, uv_executable, packages, uv_env=None, upgrade=False, offline=False):
+    """
+    Install packages into the penv using uv, or pip if no uv executable is given.
+    
+    Args:
+        python_exe: Path to Python executable in the penv
+        uv_executable: Path to uv executable (None to install with pip)
+        packages (list): Package specifications to install
+        uv_env: Optional environment for the installer subprocess
+        upgrade (bool): Whether to upgrade already installed packages, only needed
+            if one of them is installed in a version not matching its specification
+        offline (bool): Install with uv from its cache only, without network access
+    
+    Returns:
+        bool: True if installed, False if an offline install is not covered by the uv cache
+    
+    Raises:
+        subprocess.CalledProcessError: If the installer exits with an error
+        subprocess.TimeoutExpired: If the installer does not finish in time
+        FileNotFoundError: If the installer executable is not found
+    """
+    if uv_executable:
+        cmd = [uv_executable, "pip", "install", f"--python={python_exe}", "--quiet"]
+        if offline:
+            cmd.append("--offline")
+    else:
+        cmd = [
+            python_exe, "-m", "pip", "install", "--quiet",
+            "--disable-pip-version-check", "--no-input"
+        ]
+    if upgrade:
+        cmd.append("--upgrade")
+    cmd.extend(packages)
+
+    if not (uv_executable and offline):
+        subprocess.check_call(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.STDOUT,
+            timeout=300,
+            env=uv_env,
+            close_fds=SPAWN_CLOSE_FDS
+        )
+        return True
+
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=UV_OFFLINE_TIMEOUT,
+            env=uv_env,
+            close_fds=SPAWN_CLOSE_FDS
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    if result.returncode == 0:
+        return True
+    if UV_CACHE_MISS_RE.search(result.stderr or ""):
+        return False
+    raise subprocess.CalledProcessError(result.returncode, cmd, stderr=result.stderr)
+
+
+def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None, internet_check=None):
     """
     Ensure uv package manager is available in penv and install required Python dependencies.
     
@@ -231,6 +582,8 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
         python_exe: Path to Python executable in the penv
         external_uv_executable: Path to external uv executable used to create the penv (can be None)
         uv_cache_dir: Optional path to uv cache directory
+        internet_check: Optional callable returning whether the internet is reachable,
+            only called if the uv cache alone cannot install what is missing
     
     Returns:
         bool: True if successful, False otherwise
@@ -240,62 +593,10 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
     penv_uv_executable = get_executable_path(penv_dir, "uv")
 
     # Build subprocess environment with UV_CACHE_DIR if specified
-    uv_env = None
-    if uv_cache_dir:
-        uv_env = dict(os.environ)
-        uv_env["UV_CACHE_DIR"] = str(uv_cache_dir)
-    
-    # Check if uv is available in the penv
-    uv_in_penv_available = False
-    try:
-        result = subprocess.run(
-            [penv_uv_executable, "--version"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        uv_in_penv_available = result.returncode == 0
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        uv_in_penv_available = False
+    uv_env = _get_uv_env(uv_cache_dir)
     
-    # Install uv into penv if not available
-    if not uv_in_penv_available:
-        if external_uv_executable:
-            # Try external uv first to install uv into the penv
-            try:
-                subprocess.check_call(
-                    [external_uv_executable, "pip", "install", "uv>=0.1.0", f"--python={python_exe}", "--quiet"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.STDOUT,
-                    timeout=300,
-                    env=uv_env
-                )
-                uv_in_penv_available = True
-            except Exception:
-                print("Warning: uv installation via external uv failed, falling back to pip")
-
-        if not uv_in_penv_available:
-            # Fallback to pip to install uv into penv
-            try:
-                subprocess.check_call(
-                    [python_exe, "-m", "pip", "install", "uv>=0.1.0", "--quiet", "--no-cache-dir"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.STDOUT,
-                    timeout=300
-                )
-            except subprocess.CalledProcessError as e:
-                print(f"Error: uv installation via pip failed with exit code {e.returncode}")
-                return False
-            except subprocess.TimeoutExpired:
-                print("Error: uv installation via pip timed out")
-                return False
-            except FileNotFoundError:
-                print("Error: Python executable not found")
-                return False
-            except Exception as e:
-                print(f"Error installing uv package manager via pip: {e}")
-                return False
-
+    # Check if uv is available in the penv without running it
+    uv_in_penv_available = _is_native_executable(penv_uv_executable)
     
     def _get_installed_uv_packages():
         """
@@ -306,22 +607,31 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
         """
         result = {}
         try:
-            cmd = [penv_uv_executable, "pip", "list", f"--python={python_exe}", "--format=json"]
+            cmd = [penv_uv_executable, "pip", "list", f"--python={python_exe}", "--format=freeze"]
             result_obj = subprocess.run(
                 cmd,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
                 timeout=300,
-                env=uv_env
+                env=uv_env,
+                creationflags=PROBE_CREATIONFLAGS,
+                close_fds=SPAWN_CLOSE_FDS
             )
             
             if result_obj.returncode == 0:
-                content = result_obj.stdout.strip()
-                if content:
-                    packages = json.loads(content)
-                    for p in packages:
-                        result[p["name"].lower()] = pepver_to_semver(p["version"])
+                required = {canonicalize_name(name) for name in python_deps}
+                # Each line reads "name==version"
+                for line in result_obj.stdout.splitlines():
+                    name, _, version = line.partition("==")
+                    name = canonicalize_name(name.strip())
+                    if not version or name not in required:
+                        continue
+                    try:
+                        result[name] = pepver_to_semver(version.strip())
+                    except Exception:
+                        # Installed, but the version is not parseable (e.g. local builds)
+                        result[name] = None
             else:
                 print(f"Warning: uv pip list failed with exit code {result_obj.returncode}")
                 if result_obj.stderr:
@@ -329,7 +639,7 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
                 
         except subprocess.TimeoutExpired:
             print("Warning: uv pip list command timed out")
-        except (json.JSONDecodeError, KeyError) as e:
+        except ValueError as e:
             print(f"Warning: Could not parse package list: {e}")
         except FileNotFoundError:
             print("Warning: uv command not found")
@@ -338,32 +648,123 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
 
         return result
 
-    installed_packages = _get_installed_uv_packages()
+    def _get_installed_packages():
+        """
+        Get the installed versions of the required packages in virtual env 'penv'.
+        Only the distributions listed in python_deps are looked up, their metadata
+        is read in-process. Falls back to `uv pip list` if the penv site-packages
+        directory can't be located.
+        
+        Returns:
+            dict: Dictionary of installed packages with versions
+        """
+        site_packages = get_site_packages_path(penv_dir)
+        if not os.path.isdir(site_packages):
+            return _get_installed_uv_packages()
+
+        result = {}
+        for package in python_deps:
+            dist = next(importlib.metadata.distributions(name=package, path=[site_packages]), None)
+            if dist is None:
+                continue
+            try:
+                result[canonicalize_name(package)] = pepver_to_semver(dist.version)
+            except Exception:
+                # Installed, but the version is not parseable (e.g. local builds)
+                result[canonicalize_name(package)] = None
+
+        return result
+
+    installed_packages = _get_installed_packages()
     packages_to_install = list(get_packages_to_install(python_deps, installed_packages))
-    
+
+    if not packages_to_install and uv_in_penv_available:
+        _write_deps_sentinel(python_exe)
+        return True
+
+    packages_list = []
+    outdated = False
     if packages_to_install:
-        packages_list = []
-        for p in packages_to_install:
-            spec = python_deps[p]
-            if spec.startswith(('http://', 'https://', 'git+', 'file://')):
-                packages_list.append(spec)
-            else:
-                packages_list.append(f"{p}{spec}")
-        
-        cmd = [
-            penv_uv_executable, "pip", "install",
-            f"--python={python_exe}",
-            "--quiet", "--upgrade"
-        ] + packages_list
-        
+        # Deterministic request order for the installer and its caches
+        packages_list = sorted({python_requirements[p] for p in packages_to_install})
+        print(f"Installing Python dependencies: {' '.join(packages_list)}")
+
+        # Missing packages are installed in a matching version without --upgrade,
+        # which spares the index lookups for the newest release
+        outdated = any(canonicalize_name(p) in installed_packages for p in packages_to_install)
+
+    if not uv_in_penv_available:
+        external_uv_executable = external_uv_executable or _find_system_uv()
+
+    # Try to install from the uv cache first, this needs no network access
+    external_uv_failed = False
+    try:
+        if uv_in_penv_available:
+            if _install_packages(
+                python_exe, penv_uv_executable, packages_list, uv_env,
+                upgrade=outdated, offline=True
+            ):
+                _write_deps_sentinel(python_exe)
+                return True
+        elif external_uv_executable:
+            if _install_packages(
+                python_exe, external_uv_executable, ["uv>=0.1.0"] + packages_list,
+                uv_env, upgrade=outdated, offline=True
+            ):
+                _write_deps_sentinel(python_exe)
+                return True
+    except subprocess.CalledProcessError as e:
+        if uv_in_penv_available:
+            print(f"Error: Failed to install Python dependencies (exit code: {e.returncode})")
+            if e.stderr:
+                print(f"Error output: {e.stderr.strip()}")
+            return False
+        # Not a cache miss, going online with the same uv would fail the same way
+        external_uv_failed = True
+    except Exception:
+        external_uv_failed = not uv_in_penv_available
+
+    # The uv cache doesn't cover the request, wait for the connectivity check only now
+    if internet_check is not None and not internet_check():
+        print("Warning: No internet connection detected, Python dependency check will be skipped.")
+        return True
+
+    # Install uv into penv if not available
+    if not uv_in_penv_available:
+        if external_uv_executable and not external_uv_failed:
+            # Try external uv first, it installs uv into the penv together with the
+            # dependencies in a single resolution
+            try:
+                _install_packages(
+                    python_exe, external_uv_executable, ["uv>=0.1.0"] + packages_list,
+                    uv_env, upgrade=outdated
+                )
+                _write_deps_sentinel(python_exe)
+                return True
+            except Exception:
+                external_uv_failed = True
+        if external_uv_failed:
+            print("Warning: Installation via external uv failed, installing uv via pip")
+
+        # Fallback to pip to install uv into penv
         try:
-            subprocess.check_call(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.STDOUT,
-                timeout=300,
-                env=uv_env
-            )
+            _install_packages(python_exe, None, ["uv>=0.1.0"])
+        except subprocess.CalledProcessError as e:
+            print(f"Error: uv installation via pip failed with exit code {e.returncode}")
+            return False
+        except subprocess.TimeoutExpired:
+            print("Error: uv installation via pip timed out")
+            return False
+        except FileNotFoundError:
+            print("Error: Python executable not found")
+            return False
+        except Exception as e:
+            print(f"Error installing uv package manager via pip: {e}")
+            return False
+
+    if packages_list:
+        try:
+            _install_packages(python_exe, penv_uv_executable, packages_list, uv_env, upgrade=outdated)
                 
         except subprocess.CalledProcessError as e:
             print(f"Error: Failed to install Python dependencies (exit code: {e.returncode})")
@@ -378,38 +779,86 @@ def install_python_deps(python_exe, external_uv_executable, uv_cache_dir=None):
             print(f"Error installing Python dependencies: {e}")
             return False
     
+    _write_deps_sentinel(python_exe)
     return True
 
 
-def install_esptool(env, platform, python_exe, uv_executable, uv_cache_dir=None):
+def get_esptool_sentinel_path(penv_dir):
     """
-    Install esptool from package folder "tool-esptoolpy" using uv package manager.
-    Ensures esptool is installed from the specific tool-esptoolpy package directory.
+    Get the path to the file recording the package directory esptool was installed from into the penv_dir.
+    """
+    return str(Path(penv_dir) / ".pioarduino_esptool")
+
+
+def _write_esptool_sentinel(python_exe, esptool_repo_path):
+    """Record the package directory esptool is installed from in the penv."""
+    penv_dir = os.path.dirname(os.path.dirname(python_exe))
+    try:
+        with open(get_esptool_sentinel_path(penv_dir), "w", encoding="utf-8") as fp:
+            fp.write(os.path.normcase(os.path.realpath(esptool_repo_path)))
+    except OSError as e:
+        print(f"Warning: Could not write esptool install sentinel: {e}")
+
+
+def _get_esptool_editable_source(penv_dir):
+    """
+    Read the source directory of an editable esptool install from its PEP 610 direct_url.json
+    in the penv site-packages.
+    
+    Returns:
+        str or None: Source directory, "" if esptool is missing or not installed editable,
+            None if the site-packages directory doesn't exist (penv of another Python version)
+    """
+    site_packages = get_site_packages_path(penv_dir)
+    if not os.path.isdir(site_packages):
+        return None
+    dist = next(importlib.metadata.distributions(name="esptool", path=[site_packages]), None)
+    if dist is None:
+        return ""
+    try:
+        direct_url = json.loads(dist.read_text("direct_url.json") or "{}")
+    except ValueError:
+        return ""
+    url = direct_url.get("url", "")
+    if not direct_url.get("dir_info", {}).get("editable") or not url.startswith("file:"):
+        return ""
+
+    from urllib.request import url2pathname
+    return url2pathname(urlparse(url).path)
+
+
+def _is_esptool_installed_from(python_exe, esptool_repo_path):
+    """
+    Check if esptool in the penv is installed from the given package directory.
+    A matching sentinel of an earlier check or install answers without starting Python,
+    as long as the esptool script of the penv still exists. Otherwise the install metadata
+    in the penv site-packages is checked, esptool is only imported by the penv Python
+    if the site-packages directory can't be located.
     
     Args:
-        env: SCons environment object
-        platform: PlatformIO platform object  
         python_exe (str): Path to Python executable in virtual environment
-        uv_executable (str): Path to uv executable
-        uv_cache_dir: Optional path to uv cache directory
+        esptool_repo_path (str): Path to the tool-esptoolpy package directory
     
-    Raises:
-        SystemExit: If esptool installation fails or package directory not found
+    Returns:
+        bool: True if esptool is imported from esptool_repo_path, False otherwise
     """
-    esptool_repo_path = platform.get_package_dir("tool-esptoolpy") or ""
-    if not esptool_repo_path or not os.path.isdir(esptool_repo_path):
-        sys.stderr.write(
-            f"Error: 'tool-esptoolpy' package directory not found: {esptool_repo_path!r}\n"
-        )
-        sys.exit(1)
+    penv_dir = os.path.dirname(os.path.dirname(python_exe))
+    try:
+        with open(get_esptool_sentinel_path(penv_dir), "r", encoding="utf-8") as fp:
+            if (fp.read() == os.path.normcase(os.path.realpath(esptool_repo_path))
+                    and os.path.isfile(get_executable_path(penv_dir, "esptool"))):
+                return True
+    except OSError:
+        pass
 
-    # Build subprocess environment with UV_CACHE_DIR if specified
-    uv_env = None
-    if uv_cache_dir:
-        uv_env = dict(os.environ)
-        uv_env["UV_CACHE_DIR"] = str(uv_cache_dir)
+    source_dir = _get_esptool_editable_source(penv_dir)
+    if source_dir is not None:
+        expected_path = os.path.normcase(os.path.realpath(esptool_repo_path))
+        if not source_dir or os.path.normcase(os.path.realpath(source_dir)) != expected_path:
+            return False
+        _write_esptool_sentinel(python_exe, esptool_repo_path)
+        return True
 
-    # Check if esptool is already installed from the correct path
     try:
         result = subprocess.run(
             [
@@ -426,22 +875,63 @@ def install_esptool(env, platform, python_exe, uv_executable, uv_cache_dir=None)
             capture_output=True,
             check=True,
             text=True,
-            timeout=5
+            timeout=5,
+            creationflags=PROBE_CREATIONFLAGS,
+            close_fds=SPAWN_CLOSE_FDS
         )
-        
-        if result.stdout.strip() == "MATCH":
-            return
-            
+        if result.stdout.strip() != "MATCH":
+            return False
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+        return False
+
+    _write_esptool_sentinel(python_exe, esptool_repo_path)
+    return True
 
-    try:
-        subprocess.check_call([
-            uv_executable, "pip", "install", "--quiet", "--force-reinstall",
-            f"--python={python_exe}",
-            "-e", esptool_repo_path
-        ], timeout=60, env=uv_env)
 
+def _install_esptool_editable(python_exe, uv_executable, esptool_repo_path, uv_cache_dir=None):
+    """
+    Install esptool in editable mode from the given package directory into the penv.
+    Only esptool itself is reinstalled, its already satisfied dependencies are kept.
+    
+    Raises:
+        subprocess.CalledProcessError: If the installation fails
+    """
+    subprocess.check_call([
+        uv_executable, "pip", "install", "--quiet", "--reinstall-package", "esptool",
+        f"--python={python_exe}",
+        "-e", esptool_repo_path
+    ], timeout=60, env=_get_uv_env(uv_cache_dir), close_fds=SPAWN_CLOSE_FDS)
+    _write_esptool_sentinel(python_exe, esptool_repo_path)
+
+
+def install_esptool(env, platform, python_exe, uv_executable, uv_cache_dir=None):
+    """
+    Install esptool from package folder "tool-esptoolpy" using uv package manager.
+    Ensures esptool is installed from the specific tool-esptoolpy package directory.
+    
+    Args:
+        env: SCons environment object
+        platform: PlatformIO platform object  
+        python_exe (str): Path to Python executable in virtual environment
+        uv_executable (str): Path to uv executable
+        uv_cache_dir: Optional path to uv cache directory
+    
+    Raises:
+        SystemExit: If esptool installation fails or package directory not found
+    """
+    esptool_repo_path = platform.get_package_dir("tool-esptoolpy") or ""
+    if not esptool_repo_path or not os.path.isdir(esptool_repo_path):
+        sys.stderr.write(
+            f"Error: 'tool-esptoolpy' package directory not found: {esptool_repo_path!r}\n"
+        )
+        sys.exit(1)
+
+    # Check if esptool is already installed from the correct path
+    if _is_esptool_installed_from(python_exe, esptool_repo_path):
+        return
+
+    try:
+        _install_esptool_editable(python_exe, uv_executable, esptool_repo_path, uv_cache_dir)
     except subprocess.CalledProcessError as e:
         sys.stderr.write(
             f"Error: Failed to install esptool from {esptool_repo_path} (exit {e.returncode})\n"
@@ -467,7 +957,7 @@ def setup_penv_minimal(platform, platformio_dir: str, install_esptool: bool = Tr
     return _setup_python_environment_core(None, platform, platformio_dir, should_install_esptool=install_esptool)
 
 
-def _setup_python_environment_core(env, platform, platformio_dir, should_install_esptool=True):
+def _setup_python_environment_core(env, platform, platformio_dir, should_install_esptool=True, verify_deps=True):
     """
     Core Python environment setup logic shared by both SCons and minimal versions.
     
@@ -476,14 +966,24 @@ def _setup_python_environment_core(env, platform, platformio_dir, should_install
         platform: PlatformIO platform object
         platformio_dir (str): Path to PlatformIO core directory
         should_install_esptool (bool): Whether to install esptool (default: True)
+        verify_deps (bool): Whether to verify dependencies and esptool of an already
+            provisioned penv (default: True)
     
     Returns:
         tuple[str, str]: (Path to penv Python executable, Path to esptool script)
     """
+    _check_python_version()
+
     penv_dir = str(Path(platformio_dir) / "penv")
 
     # Determine uv cache directory inside .platformio/.cache
     uv_cache_dir = str(Path(platformio_dir) / ".cache" / "uv")
+
+    # A new penv always needs its dependencies installed, probe connectivity in the
+    # background while the virtual environment is created
+    internet_check = None
+    if not github_actions and not os.path.isfile(get_executable_path(penv_dir, "python")):
+        internet_check = start_internet_check()
     
     # Create virtual environment if not present
     if env is not None:
@@ -513,15 +1013,19 @@ def _setup_python_environment_core(env, platform, platformio_dir, should_install
     uv_executable = get_executable_path(penv_dir, "uv")
 
     # Install required Python dependencies for platform
-    if has_internet_connection() or github_actions:
-        if not install_python_deps(penv_python, used_uv_executable, uv_cache_dir):
+    # Skipped when a previous build already verified them for this penv, or when
+    # no verification is requested and the dependencies were installed before
+    deps_installed = os.path.isfile(get_deps_sentinel_path(penv_dir))
+    if (verify_deps or not deps_installed) and not python_deps_up_to_date(penv_python):
+        # Connectivity is probed in the background while the installed packages are checked
+        if internet_check is None and not github_actions:
+            internet_check = start_internet_check()
+        if not install_python_deps(penv_python, used_uv_executable, uv_cache_dir, internet_check):
             sys.stderr.write("Error: Failed to install Python dependencies into penv\n")
             sys.exit(1)
-    else:
-        print("Warning: No internet connection detected, Python dependency check will be skipped.")
 
     # Install esptool package if required
-    if should_install_esptool:
+    if should_install_esptool and verify_deps:
         if env is not None:
             # SCons version
             install_esptool(env, platform, penv_python, uv_executable, uv_cache_dir)
@@ -545,57 +1049,23 @@ def _setup_pipenv_minimal(penv_dir):
     Returns:
         str or None: Path to uv executable if uv was used, None if python -m venv was used
     """
-    if not os.path.isfile(get_executable_path(penv_dir, "python")):
-        # Attempt virtual environment creation using uv package manager
-        uv_success = False
-        uv_cmd = None
-        try:
-            # Derive uv path from current Python path
-            python_dir = os.path.dirname(sys.executable)
-            uv_exe_suffix = ".exe" if IS_WINDOWS else ""
-            uv_cmd = str(Path(python_dir) / f"uv{uv_exe_suffix}")
-            
-            # Fall back to system uv if derived path doesn't exist
-            if not os.path.isfile(uv_cmd):
-                uv_cmd = "uv"
-                
-            subprocess.check_call(
-                [uv_cmd, "venv", "--clear", f"--python={sys.executable}", penv_dir],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=90
-            )
-            uv_success = True
-            print(f"Created pioarduino Python virtual environment using uv: {penv_dir}")
+    if os.path.isfile(get_executable_path(penv_dir, "python")):
+        return None
 
-        except Exception:
-            pass
-        
-        # Fallback to python -m venv if uv failed or is not available
-        if not uv_success:
-            uv_cmd = None
-            try:
-                subprocess.check_call([
-                    sys.executable, "-m", "venv", "--clear", penv_dir
-                ])
-                print(f"Created pioarduino Python virtual environment: {penv_dir}")
-            except subprocess.CalledProcessError as e:
-                sys.stderr.write(f"Error: Failed to create virtual environment: {e}\n")
-                sys.exit(1)
-        
-        # Validate virtual environment creation
-        # Ensure Python executable is available
-        penv_python = get_executable_path(penv_dir, "python")
-        if not os.path.isfile(penv_python):
-            sys.stderr.write(
-                f"Error: Failed to create a proper virtual environment. "
-                f"Missing the `python` binary at {penv_python}! Created with uv: {uv_success}\n"
-            )
+    # Attempt virtual environment creation using uv package manager
+    uv_cmd = _create_venv_with_uv(sys.executable, penv_dir)
+
+    # Fallback to the venv module if uv failed or is not available
+    if uv_cmd is None:
+        try:
+            _create_venv_in_process(penv_dir)
+            print(f"Created pioarduino Python virtual environment: {penv_dir}")
+        except (OSError, subprocess.CalledProcessError) as e:
+            sys.stderr.write(f"Error: Failed to create virtual environment: {e}\n")
             sys.exit(1)
-        
-        return uv_cmd if uv_success else None
-    
-    return None
+
+    _check_created_penv(penv_dir, uv_cmd)
+    return uv_cmd
 
 
 def _install_esptool_from_tl_install(platform, python_exe, uv_executable, uv_cache_dir=None):
@@ -616,44 +1086,12 @@ def _install_esptool_from_tl_install(platform, python_exe, uv_executable, uv_cac
     if not esptool_repo_path or not os.path.isdir(esptool_repo_path):
         return (None, None)
 
-    # Build subprocess environment with UV_CACHE_DIR if specified
-    uv_env = None
-    if uv_cache_dir:
-        uv_env = dict(os.environ)
-        uv_env["UV_CACHE_DIR"] = str(uv_cache_dir)
-
     # Check if esptool is already installed from the correct path
-    try:
-        result = subprocess.run(
-            [
-                python_exe,
-                "-c",
-                (
-                    "import esptool, os, sys; "
-                    "expected_path = os.path.normcase(os.path.realpath(sys.argv[1])); "
-                    "actual_path = os.path.normcase(os.path.realpath(os.path.dirname(esptool.__file__))); "
-                    "print('MATCH' if actual_path.startswith(expected_path) else 'MISMATCH')"
-                ),
-                esptool_repo_path,
-            ],
-            capture_output=True,
-            check=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.stdout.strip() == "MATCH":
-            return
-            
-    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+    if _is_esptool_installed_from(python_exe, esptool_repo_path):
+        return
 
     try:
-        subprocess.check_call([
-            uv_executable, "pip", "install", "--quiet", "--force-reinstall",
-            f"--python={python_exe}",
-            "-e", esptool_repo_path
-        ], timeout=60, env=uv_env)
+        _install_esptool_editable(python_exe, uv_executable, esptool_repo_path, uv_cache_dir)
         print(f"Installed esptool from tl-install path: {esptool_repo_path}")
 
     except subprocess.CalledProcessError as e:
@@ -661,19 +1099,68 @@ def _install_esptool_from_tl_install(platform, python_exe, uv_executable, uv_cac
         # Don't exit - esptool installation is not critical for penv setup
 
 
+def get_certifi_cache_path(penv_dir):
+    """
+    Get the path to the file caching the certifi bundle location of the penv_dir.
+    """
+    return str(Path(penv_dir) / ".pioarduino_certifi.json")
+
+
+def _get_certifi_path(python_exe):
+    """
+    Get the certifi CA bundle of the python_exe virtual environment.
+    The bundle is looked up in the penv site-packages, the penv interpreter is only asked
+    for it if it runs another Python version. Its answer is cached until the Python
+    executable is replaced or the bundle disappears.
+    
+    Returns:
+        str: Path to the CA bundle
+    
+    Raises:
+        Exception: If certifi can't be imported in the virtual environment
+    """
+    penv_dir = os.path.dirname(os.path.dirname(python_exe))
+
+    # certifi.where() is the bundle inside the installed package. The site-packages path
+    # is only found if the penv runs the same Python version as this interpreter.
+    cert_path = os.path.join(get_site_packages_path(penv_dir), "certifi", "cacert.pem")
+    if os.path.isfile(cert_path):
+        return cert_path
+
+    cache_path = get_certifi_cache_path(penv_dir)
+    python_mtime = os.path.getmtime(python_exe)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as fp:
+            cache = json.load(fp)
+        if cache["python_mtime"] == python_mtime and os.path.isfile(cache["certifi"]):
+            return cache["certifi"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    # Run python executable from penv to get certifi path
+    out = subprocess.check_output(
+        [python_exe, "-c", "import certifi; print(certifi.where())"],
+        text=True,
+        timeout=5,
+        creationflags=PROBE_CREATIONFLAGS,
+        close_fds=SPAWN_CLOSE_FDS
+    )
+    cert_path = out.strip()
+    try:
+        with open(cache_path, "w", encoding="utf-8") as fp:
+            json.dump({"python_mtime": python_mtime, "certifi": cert_path}, fp)
+    except OSError:
+        pass
+    return cert_path
+
+
 def _setup_certifi_env(env, python_exe):
     """
     Setup certifi environment variables from the given python_exe virtual environment.
-    Uses a subprocess call to extract certifi path from that environment to guarantee penv usage.
+    The certifi path is extracted from that environment to guarantee penv usage.
     """
     try:
-        # Run python executable from penv to get certifi path
-        out = subprocess.check_output(
-            [python_exe, "-c", "import certifi; print(certifi.where())"],
-            text=True,
-            timeout=5
-        )
-        cert_path = out.strip()
+        cert_path = _get_certifi_path(python_exe)
     except Exception as e:
         print(f"Error: Failed to obtain certifi path from the virtual environment: {e}")
         return
@@ -698,7 +1185,7 @@ def _setup_certifi_env(env, python_exe):
         env.Replace(ENV=env_vars)
 
 
-def setup_python_environment(env, platform, platformio_dir):
+def setup_python_environment(env, platform, platformio_dir, verify_deps=True):
     """
     Main function to setup the Python virtual environment and dependencies.
     
@@ -706,6 +1193,8 @@ def setup_python_environment(env, platform, platformio_dir):
         env: SCons environment object
         platform: PlatformIO platform object
         platformio_dir (str): Path to PlatformIO core directory
+        verify_deps (bool): Whether to verify dependencies and esptool of an already
+            provisioned penv (default: True)
     
     Returns:
         tuple[str, str]: (Path to penv Python executable, Path to esptool script)
@@ -713,4 +1202,6 @@ def setup_python_environment(env, platform, platformio_dir):
     Raises:
         SystemExit: If Python version < 3.10 or dependency installation fails
     """
-    return _setup_python_environment_core(env, platform, platformio_dir, should_install_esptool=True)
+    return _setup_python_environment_core(
+        env, platform, platformio_dir, should_install_esptool=True, verify_deps=verify_deps
+    )
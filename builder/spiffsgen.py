@@ -611,8 +611,9 @@ class SpiffsFS(object):
                         content = page_data[content_start:content_start + self.build_config.OBJ_DATA_PAGE_CONTENT_LEN]
                         files_map[real_obj_id]['data_pages'].append((span_ix, content))
 
-        # Extract files to output directory
+        # Extract files to output directory, progress is printed at once
         file_count = 0
+        log_lines = []
         for obj_id, file_info in files_map.items():
             if file_info['name'] is None:
                 continue
@@ -621,7 +622,7 @@ class SpiffsFS(object):
             rel_path = file_info['name'].lstrip('/')
             file_path = os.path.join(output_dir, rel_path)
             if not rel_path:
-                print(f"  Warning: Skipping file with empty path (obj_id={obj_id})")
+                log_lines.append(f"  Warning: Skipping file with empty path (obj_id={obj_id})")
                 continue
 
             # Create parent directories
@@ -643,8 +644,10 @@ class SpiffsFS(object):
                     total_written += to_write
 
             file_count += 1
-            print(f"  Extracted: {file_info['name']} ({file_info['size']} bytes)")
+            log_lines.append(f"  Extracted: {file_info['name']} ({file_info['size']} bytes)")
 
+        if log_lines:
+            print("\n".join(log_lines))
         return file_count
 
 